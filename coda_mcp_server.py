@@ -6,13 +6,26 @@ by calling the tools defined in this server.
 The server uses the `codaio` Python library to communicate with the Coda API.
 """
 import os
+import io
+import sys
+import csv
+import time
+import zlib
+import uuid
+import shutil
+import hashlib
 import asyncio
-import requests
+import contextlib
+from contextlib import asynccontextmanager
+import aiofiles
+import aiohttp
+import orjson
 from dotenv import load_dotenv
 from mcp.server.fastmcp import FastMCP, Context
 from codaio import Coda, Document
-import json
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 # --- Environment Setup ---
 # Load environment variables from a .env file for local development.
 load_dotenv()
@@ -22,27 +35,35 @@ load_dotenv()
 # Retrieve the Coda API key from environment variables.
 CODA_API_KEY = os.getenv("CODA_API_KEY")
 WORKING_DIR_RESTRICTION = os.getenv("WORKING_DIR_RESTRICTION")
+CODA_API_URL = "https://coda.io/apis/v1"
+# Downloaded attachments and saved tables are kept in a content-addressed cache
+# so unchanged files are not fetched again. The cache is trimmed to
+# CODA_CACHE_MAX_BYTES. A saved table is reused for at most
+# CODA_TABLE_SNAPSHOT_TTL seconds; 0 turns table snapshots off.
+CODA_CACHE_DIR = os.getenv("CODA_CACHE_DIR", os.path.expanduser("~/.cache/coda_mcp"))
+CODA_CACHE_MAX_BYTES = int(os.getenv("CODA_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+CODA_TABLE_SNAPSHOT_TTL = int(os.getenv("CODA_TABLE_SNAPSHOT_TTL", 300))
 
 # Ensure the API key is set, otherwise raise an error.
 if not CODA_API_KEY:
     raise ValueError("The CODA_API_KEY environment variable is not set.")
 
 
-def resolve_path(path: str) -> str:
-    if not WORKING_DIR_RESTRICTION:
-        return os.path.abspath(os.path.normpath(path))
+# The restriction root is normalized once here rather than on every call.
+_ABS_RESTRICTION = os.path.abspath(os.path.normpath(WORKING_DIR_RESTRICTION)) if WORKING_DIR_RESTRICTION else None
+_ABS_RESTRICTION_SEP = _ABS_RESTRICTION.rstrip(os.sep) + os.sep if _ABS_RESTRICTION else None
 
-    # Ensure restriction itself is absolute and normalized
-    abs_restriction = os.path.abspath(os.path.normpath(WORKING_DIR_RESTRICTION))
 
-    # Ensure we are working with absolute normalized paths
-    if not os.path.isabs(path):
-        full_path = os.path.abspath(os.path.normpath(os.path.join(abs_restriction, path)))
-    else:
-        full_path = os.path.abspath(os.path.normpath(path))
+def resolve_path(path: str) -> str:
+    if not _ABS_RESTRICTION:
+        return os.path.abspath(path)
+
+    # Relative paths are taken relative to the restriction; join() keeps
+    # absolute paths as they are, so a single normpath is enough.
+    full_path = os.path.normpath(os.path.join(_ABS_RESTRICTION, path))
 
     # Check if the resolved path is within the restriction
-    if os.path.commonpath([abs_restriction, full_path]) == abs_restriction:
+    if full_path == _ABS_RESTRICTION or full_path.startswith(_ABS_RESTRICTION_SEP):
         return full_path
 
     raise ValueError(f"Access to path {path} is restricted to {WORKING_DIR_RESTRICTION}")
@@ -53,13 +74,372 @@ def resolve_path(path: str) -> str:
 # This client will be used by all tools to make requests to the Coda API.
 coda = Coda(CODA_API_KEY)
 
+# Document handles are cached per doc_id so repeated tool calls don't refetch
+# the document metadata. Entries expire after _TTL seconds, and at most
+# _DOC_CACHE_MAXSIZE documents are kept, least recently used first out.
+_TTL = 300
+_DOC_CACHE_MAXSIZE = 64
+_DOC_CACHE: dict[str, tuple[float, Document]] = {}
+_DOC_LOCKS: dict[str, list] = {}
+
+
+# Each entry of a lock table is [lock, number of callers holding or waiting
+# for it], so a lock is dropped as soon as nobody needs it and the table
+# doesn't grow with every key ever seen.
+@asynccontextmanager
+async def _keyed_lock(locks: dict[str, list], key: str):
+    """Holds the lock for key in locks, creating it on first use and removing it once unused."""
+    entry = locks.get(key)
+    if entry is None:
+        entry = locks[key] = [asyncio.Lock(), 0]
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if not entry[1]:
+            del locks[key]
+
+
+async def _get_doc(doc_id: str) -> Document:
+    """Returns a cached Document for doc_id, constructing it on a miss."""
+    async with _keyed_lock(_DOC_LOCKS, doc_id):
+        cached = _DOC_CACHE.pop(doc_id, None)
+        if cached and time.monotonic() - cached[0] < _TTL:
+            # Re-inserting moves the entry to the most recently used end.
+            _DOC_CACHE[doc_id] = cached
+            return cached[1]
+
+        document = await asyncio.to_thread(Document, doc_id, coda=coda)
+        if len(_DOC_CACHE) >= _DOC_CACHE_MAXSIZE:
+            _DOC_CACHE.pop(next(iter(_DOC_CACHE)))
+        _DOC_CACHE[doc_id] = (time.monotonic(), document)
+        return document
+
+
+# Doc and table listings change rarely within a session, so they are kept for
+# _METADATA_TTL seconds. Keys are (tool name, *arguments).
+_METADATA_TTL = 60
+_METADATA_MAXSIZE = 256
+_METADATA_CACHE: dict[tuple, tuple[float, object]] = {}
+
+
+async def _cached(key: tuple, fetch):
+    """Returns the cached value for key, awaiting fetch() on a miss or after expiry."""
+    cached = _METADATA_CACHE.get(key)
+    if cached and time.monotonic() - cached[0] < _METADATA_TTL:
+        return cached[1]
+
+    value = await fetch()
+    _METADATA_CACHE.pop(key, None)
+    if len(_METADATA_CACHE) >= _METADATA_MAXSIZE:
+        _METADATA_CACHE.pop(next(iter(_METADATA_CACHE)))
+    _METADATA_CACHE[key] = (time.monotonic(), value)
+    return value
+
+
+# A single HTTP session is shared by all tools so connections (and their TLS
+# sessions) to Coda and its file host are reused across calls. It is created
+# lazily because aiohttp sessions are bound to the running event loop.
+_HTTP_SESSION: aiohttp.ClientSession | None = None
+_HTTP_SESSION_LOOP: asyncio.AbstractEventLoop | None = None
+
+
+def _get_http_session() -> aiohttp.ClientSession:
+    """Returns the shared HTTP session, creating it on first use."""
+    global _HTTP_SESSION, _HTTP_SESSION_LOOP
+    loop = asyncio.get_running_loop()
+    if _HTTP_SESSION is None or _HTTP_SESSION.closed or _HTTP_SESSION_LOOP is not loop:
+        connector = aiohttp.TCPConnector(limit=32, keepalive_timeout=60)
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=30)
+        _HTTP_SESSION = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        _HTTP_SESSION_LOOP = loop
+    return _HTTP_SESSION
+
+
+async def _close_http_session():
+    global _HTTP_SESSION
+    if _HTTP_SESSION is not None and not _HTTP_SESSION.closed:
+        await _HTTP_SESSION.close()
+    _HTTP_SESSION = None
+
+
+async def _fetch_row_page(doc_id: str, table_id: str, params: dict) -> dict:
+    """Fetches a single page from the Coda rows endpoint."""
+    url = f"{CODA_API_URL}/docs/{doc_id}/tables/{table_id}/rows"
+    headers = {"Authorization": f"Bearer {CODA_API_KEY}"}
+    async with _get_http_session().get(url, headers=headers, params=params) as response:
+        response.raise_for_status()
+        return orjson.loads(await response.read())
+
+
+async def _fetch_table_info(doc_id: str, table_id: str) -> dict:
+    """Fetches a table's metadata, including its `updatedAt` timestamp."""
+    url = f"{CODA_API_URL}/docs/{doc_id}/tables/{table_id}"
+    headers = {"Authorization": f"Bearer {CODA_API_KEY}"}
+    async with _get_http_session().get(url, headers=headers) as response:
+        response.raise_for_status()
+        return orjson.loads(await response.read())
+
+
+async def _iter_row_pages(doc_id: str, table_id: str, params: dict):
+    """
+    Yields pages of rows from the Coda rows endpoint, following `nextPageToken`.
+    The next page is fetched in the background while the caller processes the
+    current one. Iterate it inside contextlib.aclosing, so the background fetch
+    is cancelled as soon as the caller stops, including on an error.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+
+    async def produce():
+        page_params = dict(params)
+        try:
+            while True:
+                page = await _fetch_row_page(doc_id, table_id, page_params)
+                await queue.put(page)
+
+                page_token = page.get("nextPageToken")
+                if not page_token:
+                    break
+                page_params = {**params, "pageToken": page_token}
+        except Exception as e:
+            await queue.put(e)
+            return
+        await queue.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            page = await queue.get()
+            if page is None:
+                return
+            if isinstance(page, Exception):
+                raise page
+            yield page
+    finally:
+        producer.cancel()
+
+
+# aiofiles runs every write on a worker thread, so downloads are written in
+# large chunks to keep the number of thread hops (and write syscalls) low.
+_DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# One lock per cache object, so concurrent downloads of the same attachment
+# don't write to the same .part file. Entries are managed by _keyed_lock.
+_DOWNLOAD_LOCKS: dict[str, list] = {}
+
+
+def _attachment_cache_path(url: str, size: int) -> str:
+    """Returns the cache location for the attachment identified by (url, size)."""
+    key = hashlib.blake2b(f"{url}|{size}".encode(), digest_size=16).hexdigest()
+    return os.path.join(CODA_CACHE_DIR, "objects", key)
+
+
+def _evict_cache(cache_dir: str):
+    """Removes the least recently used cache entries until the cache fits in CODA_CACHE_MAX_BYTES."""
+    # An entry is an object plus any sidecar sharing its key (a table
+    # snapshot's .columns file), so the two are always evicted together.
+    # Temporary files belong to writes still in progress and are left alone.
+    groups: dict[str, list] = {}
+    try:
+        with os.scandir(os.path.join(cache_dir, "objects")) as it:
+            for entry in it:
+                if entry.name.endswith(".tmp") or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                group = groups.setdefault(entry.name.split(".", 1)[0], [0.0, 0, []])
+                group[0] = max(group[0], stat.st_mtime)
+                group[1] += stat.st_size
+                group[2].append(entry.path)
+    except OSError as e:
+        if not isinstance(e, FileNotFoundError):
+            print(f"Could not scan the cache in {cache_dir}: {e}", file=sys.stderr, flush=True)
+        return
+
+    total = sum(size for _, size, _ in groups.values())
+    for _, size, paths in sorted(groups.values()):
+        if total <= CODA_CACHE_MAX_BYTES:
+            break
+        # Reverse order removes a sidecar before its object, so a concurrent
+        # lookup never finds a sidecar whose object is already gone.
+        for path in sorted(paths, reverse=True):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+        total -= size
+
+
+def _write_parquet(path: str, columns: dict[str, list]):
+    """Writes a table given as column lists to a zstd-compressed parquet file."""
+    arrays = {}
+    for name, values in columns.items():
+        # Blank Coda cells come back as "". Arrow infers each column's type,
+        # widening ints mixed with floats; a column it can't type as a whole
+        # is stored as text.
+        values = [None if value == "" else value for value in values]
+        try:
+            arrays[name] = pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arrays[name] = pa.array([None if value is None else str(value) for value in values])
+
+    # The column lists go straight into Arrow arrays, without a DataFrame.
+    pq.write_table(pa.table(arrays), path, compression='zstd')
+
+
+async def _save_table(doc_id: str, table_id: str, path: str, params: dict, compress: bool) -> list[str]:
+    """Fetches all rows of a table, writes them to path as CSV or parquet, and returns the column names."""
+    # The table is written to a temporary file that replaces path only once it
+    # is complete. A failed save leaves path untouched, and path never shares
+    # an inode with a file written earlier.
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        cols = await _write_table(doc_id, table_id, tmp, params, path.endswith('.parquet'), compress)
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp)
+        raise
+    return cols
+
+
+async def _write_table(doc_id: str, table_id: str, path: str, params: dict, parquet: bool, compress: bool) -> list[str]:
+    cols = None
+    if parquet:
+        # Parquet is written in one go, so rows are collected column by
+        # column in a single pass rather than as a list of row dicts.
+        columns: dict[str, list] = {}
+        async with contextlib.aclosing(_iter_row_pages(doc_id, table_id, params)) as pages:
+            async for page in pages:
+                for item in page.get("items", []):
+                    values = item.get("values", {})
+                    if cols is None:
+                        cols = list(values)
+                        columns = {col: [] for col in cols}
+                    for col in cols:
+                        columns[col].append(values.get(col))
+
+        await asyncio.to_thread(_write_parquet, path, columns)
+        return cols or []
+
+    # wbits=31 makes zlib emit a gzip stream; level 1 is much faster
+    # than the default for little loss in ratio.
+    compressor = zlib.compressobj(1, zlib.DEFLATED, 31) if compress else None
+
+    # Rows are written page by page as they arrive, so the full table is
+    # never held in memory. The header comes from the first row's columns.
+    async with aiofiles.open(path, 'wb') as f:
+        async with contextlib.aclosing(_iter_row_pages(doc_id, table_id, params)) as pages:
+            async for page in pages:
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for item in page.get("items", []):
+                    values = item.get("values", {})
+                    if cols is None:
+                        cols = list(values)
+                        writer.writerow(cols)
+                    writer.writerow([values.get(col) for col in cols])
+                data = buffer.getvalue().encode()
+                await f.write(compressor.compress(data) if compressor else data)
+        if compressor:
+            await f.write(compressor.flush())
+    return cols or []
+
+
+def _copy_file(src: str, dst: str):
+    """Copies src to dst through a temporary file, so dst is replaced in one step."""
+    tmp = f"{dst}.{uuid.uuid4().hex}.tmp"
+    try:
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp)
+        raise
+
+
+def _table_snapshot_path(doc_id: str, table_id: str, updated_at: str, fmt: str) -> str:
+    """Returns the cache location for a saved copy of a table as of updated_at."""
+    key = hashlib.blake2b(f"{doc_id}|{table_id}|{updated_at}|{fmt}".encode(), digest_size=16).hexdigest()
+    return os.path.join(CODA_CACHE_DIR, "objects", key)
+
+
+# Snapshots are copied rather than hardlinked to and from the output file, so
+# editing a saved table can never change what the cache serves. The sidecar
+# records the snapshot's size as a check against a damaged cache object, and
+# when it was taken, so a snapshot is not served past CODA_TABLE_SNAPSHOT_TTL.
+# The cache is best-effort: if it can't be read or written, the table is
+# fetched and saved as if there were no cache.
+def _load_table_snapshot(snapshot_path: str, path: str) -> list[str] | None:
+    """Copies a cached table snapshot to path and returns its columns, or None on a miss."""
+    meta_path = f"{snapshot_path}.columns"
+    try:
+        with open(meta_path, 'rb') as f:
+            meta = orjson.loads(f.read())
+        if time.time() - meta["created"] > CODA_TABLE_SNAPSHOT_TTL:
+            return None
+        if os.path.getsize(snapshot_path) != meta["size"]:
+            return None
+        _copy_file(snapshot_path, path)
+        os.utime(snapshot_path)
+        os.utime(meta_path)
+    except (FileNotFoundError, KeyError, TypeError, orjson.JSONDecodeError):
+        return None
+    except OSError as e:
+        print(f"Could not read table snapshot {snapshot_path}: {e}", file=sys.stderr, flush=True)
+        return None
+    return meta["columns"]
+
+
+def _store_table_snapshot(snapshot_path: str, path: str, cols: list[str]) -> bool:
+    """Adds a freshly written table file and its columns to the snapshot cache, returning whether it was stored."""
+    try:
+        os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+        _copy_file(path, snapshot_path)
+        meta = {"columns": cols, "size": os.path.getsize(snapshot_path), "created": time.time()}
+        tmp = f"{snapshot_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(orjson.dumps(meta))
+            os.replace(tmp, f"{snapshot_path}.columns")
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp)
+            raise
+    except OSError as e:
+        print(f"Could not store table snapshot {snapshot_path}: {e}", file=sys.stderr, flush=True)
+        return False
+    return True
+
+
+# References to fire-and-forget tasks, so they aren't garbage collected mid-run.
+_BACKGROUND_TASKS: set[asyncio.Task] = set()
+
+
+def _run_in_background(func, *args):
+    task = asyncio.create_task(asyncio.to_thread(func, *args))
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_BACKGROUND_TASKS.discard)
+
 
 # --- MCP Server Definition ---
+# The lifespan hook closes the shared HTTP session and the extraction pool
+# when the server stops.
+@asynccontextmanager
+async def _lifespan(server: FastMCP):
+    try:
+        yield
+    finally:
+        await _close_http_session()
+        if _EXTRACT_POOL is not None:
+            await asyncio.to_thread(_EXTRACT_POOL.shutdown, cancel_futures=True)
+
+
 # Instantiate the FastMCP server, giving it a name and instructions
 # that can be displayed to clients.
 mcp = FastMCP(
     name="Coda MCP Server",
-    instructions="A server to interact with the Coda API."
+    instructions="A server to interact with the Coda API.",
+    lifespan=_lifespan
 )
 
 
@@ -74,8 +454,11 @@ async def list_docs():
         dict: a dictionary with the doc names and doc IDs in an 'items' list.
     """
     try:
-        docs = await asyncio.to_thread(coda.list_docs)
-        items = [{"name": doc["name"], "id": doc["id"]} for doc in docs.get("items", [])]
+        async def fetch_docs():
+            docs = await asyncio.to_thread(coda.list_docs)
+            return [{"name": doc["name"], "id": doc["id"]} for doc in docs.get("items", [])]
+
+        items = await _cached(("list_docs",), fetch_docs)
         return {"items": items}
         
     except Exception as e:
@@ -83,50 +466,92 @@ async def list_docs():
 
 
 @mcp.tool()
-async def list_tables(doc_id: str):
+async def list_tables(doc_id: str, name_contains: str | None = None):
     """
     Lists all tables within a specific Coda document.
 
     Args:
         doc_id (str): The ID of the Coda document to inspect.
+        name_contains (str, optional): If given, only tables whose name contains
+            this text (case-insensitive) are returned.
 
     Returns:
         dict: A dictionary mapping table names to their IDs.
     """
     try:
-        # Initialize the Document object
-        document = await asyncio.to_thread(Document, doc_id, coda=coda)
-        tables = await asyncio.to_thread(document.list_tables)
-        doc_dict = {table.name: table.id for table in tables}
+        async def fetch_tables():
+            document = await _get_doc(doc_id)
+            tables = await asyncio.to_thread(document.list_tables)
+            return [(table.name, table.id) for table in tables]
+
+        tables = await _cached(("list_tables", doc_id), fetch_tables)
+        needle = name_contains.lower() if name_contains else None
+        doc_dict = {
+            name: table_id
+            for name, table_id in tables
+            if needle is None or needle in name.lower()
+        }
 
         return doc_dict
     except Exception as e:
         raise RuntimeError(f"An error occurred while listing tables for doc '{doc_id}': {e}")
     
 @mcp.tool()
-async def get_table_content(doc_id: str, table_id: str, output_filepath: str):
+async def get_table_content(doc_id: str, table_id: str, output_filepath: str, inspect_only: bool = False, compress: bool = False):
     """
     Retrieves all rows and their content from a specific table in a Coda document.
-    Saves the table to a .csv file and returns column metadata.
+    Saves the table to a .csv file, or to a .parquet file if output_filepath ends
+    in '.parquet', and returns column metadata.
+    A table that hasn't changed since it was saved in the same format within
+    the last few minutes is copied from the local cache instead of being
+    fetched again.
 
     Args:
         doc_id (str): The ID of the Coda document.
         table_id (str): The ID of the table to retrieve content from.
         output_filepath (str): The filepath where the table contents will be saved.
+        inspect_only (bool): If True, only the column metadata is returned and no file
+            is written. Use this when only the table schema is needed.
+        compress (bool): If True, a CSV is saved gzip-compressed and '.gz' is
+            appended to output_filepath. Parquet files are always compressed.
+
     Returns:
-        dict: A dictionary containing 'num_columns' and either 'columns' (list) or 'summary' (string).
+        dict: A dictionary containing 'num_columns' and either 'columns' (list) or 'summary' (string),
+            plus 'output_filepath' when a file was written.
     """
     try:
         resolved_output_filepath = resolve_path(output_filepath)
-        doc = await asyncio.to_thread(Document, doc_id, coda=coda)
-        table = await asyncio.to_thread(doc.get_table, table_id)
-
-        data = await asyncio.to_thread(table.to_dict)
-        table_df = pd.DataFrame(data)
-
-        await asyncio.to_thread(table_df.to_csv, resolved_output_filepath, index=False)
+        params = {
+            "valueFormat": "simple",
+            "useColumnNames": "true",
+            "limit": 200
+        }
 
-        cols = list(table_df.columns)
+        if inspect_only:
+            page = await _fetch_row_page(doc_id, table_id, {**params, "limit": 1})
+            items = page.get("items", [])
+            cols = list(items[0].get("values", {})) if items else []
+        else:
+            is_parquet = resolved_output_filepath.endswith('.parquet')
+            compress = compress and not is_parquet
+            if compress and not resolved_output_filepath.endswith('.gz'):
+                resolved_output_filepath += '.gz'
+
+            # Tables that haven't changed since they were last saved are
+            # copied from the snapshot cache instead of being fetched again.
+            # updatedAt can lag behind edits, hence the snapshot TTL as well.
+            table_info = await _fetch_table_info(doc_id, table_id)
+            updated_at = table_info.get("updatedAt")
+            fmt = "parquet" if is_parquet else "csv.gz" if compress else "csv"
+            snapshot_path = _table_snapshot_path(doc_id, table_id, updated_at, fmt) if updated_at and CODA_TABLE_SNAPSHOT_TTL > 0 else None
+            cols = await asyncio.to_thread(_load_table_snapshot, snapshot_path, resolved_output_filepath) if snapshot_path else None
+
+            if cols is None:
+                cols = await _save_table(doc_id, table_id, resolved_output_filepath, params, compress)
+                if snapshot_path and await asyncio.to_thread(_store_table_snapshot, snapshot_path, resolved_output_filepath, cols):
+                    _run_in_background(_evict_cache, CODA_CACHE_DIR)
+
+        cols = cols or []
         num_cols = len(cols)
 
         result = {"num_columns": num_cols}
@@ -138,6 +563,9 @@ async def get_table_content(doc_id: str, table_id: str, output_filepath: str):
             last_15 = cols[-15:]
             result["summary"] = f"number of columns = {num_cols}, first 15 columns = {first_15}; last 15 columns = {last_15}"
 
+        if not inspect_only:
+            result["output_filepath"] = resolved_output_filepath
+
         return result
     except Exception as e:
         raise RuntimeError(f"An error occurred while getting content for table '{table_id}': {e}")
@@ -156,57 +584,57 @@ async def get_table_attachments(doc_id: str, table_id: str, attachment_column_na
         List of dicts with file metadata (name, url, mimeType, size)
     """
     try:
-        url = f"https://coda.io/apis/v1/docs/{doc_id}/tables/{table_id}/rows"
-        headers = {"Authorization": f"Bearer {CODA_API_KEY}"}
         params = {
             "valueFormat": "rich",
-            "useColumnNames": True
+            "useColumnNames": "true",
+            "limit": 200
         }
-
-        response = await asyncio.to_thread(requests.get, url, headers=headers, params=params)
-        response.raise_for_status()
-
-        data = response.json()
         attachments = []
 
-        for item in data.get("items", []):
-            row_id = item.get("id")
-            values = item.get("values", {})
-            file_data = values.get(attachment_column_name)
-
-            if isinstance(file_data, list):
-                for file_info in file_data:
-                    if isinstance(file_info, dict) and "url" in file_info:
+        async with contextlib.aclosing(_iter_row_pages(doc_id, table_id, params)) as pages:
+            async for page in pages:
+                for item in page.get("items", []):
+                    row_id = item.get("id")
+                    values = item.get("values", {})
+                    file_data = values.get(attachment_column_name)
+
+                    if isinstance(file_data, list):
+                        for file_info in file_data:
+                            if isinstance(file_info, dict) and "url" in file_info:
+                                attachments.append({
+                                    "row_id": row_id,
+                                    "name": file_info.get("name"),
+                                    "url": file_info.get("url"),
+                                    "mimeType": file_info.get("mimeType"),
+                                    "size": file_info.get("size")
+                                })
+                    elif isinstance(file_data, dict) and "url" in file_data:
                         attachments.append({
                             "row_id": row_id,
-                            "name": file_info.get("name"),
-                            "url": file_info.get("url"),
-                            "mimeType": file_info.get("mimeType"),
-                            "size": file_info.get("size")
+                            "name": file_data.get("name"),
+                            "url": file_data.get("url"),
+                            "mimeType": file_data.get("mimeType"),
+                            "size": file_data.get("size")
                         })
-            elif isinstance(file_data, dict) and "url" in file_data:
-                attachments.append({
-                    "row_id": row_id,
-                    "name": file_data.get("name"),
-                    "url": file_data.get("url"),
-                    "mimeType": file_data.get("mimeType"),
-                    "size": file_data.get("size")
-                })
 
         return attachments
     except Exception as e:
         raise RuntimeError(f"An error occurred while getting attachments: {e}")
 
 @mcp.tool()
-async def download_coda_attachments(doc_id: str, table_id: str, attachment_column_name: str, output_dir: str):
+async def download_coda_attachments(doc_id: str, table_id: str, attachment_column_name: str, output_dir: str, max_concurrent: int = 8, resume: bool = True):
     """
     Download all files from a Coda table attachment column to a local directory.
+    Files are downloaded concurrently, at most `max_concurrent` at a time.
 
     Args:
         doc_id: Coda document ID
         table_id: Coda table ID
         attachment_column_name: Name of column containing attachments
         output_dir: Directory to save downloaded files
+        max_concurrent: Maximum number of simultaneous downloads
+        resume: Resume an interrupted download of the same attachment from
+            where it stopped instead of starting over
 
     Returns:
         List of downloaded file paths
@@ -216,14 +644,36 @@ async def download_coda_attachments(doc_id: str, table_id: str, attachment_colum
 
         resolved_output_dir = resolve_path(output_dir)
         os.makedirs(resolved_output_dir, exist_ok=True)
-        downloaded_paths = []
 
-        for att in attachments:
+        # The cache is best-effort: if its directories can't be created or
+        # written to, every attachment is fetched whole, as if it had no size.
+        use_cache = True
+        try:
+            for sub in ("objects", "partial"):
+                cache_subdir = os.path.join(CODA_CACHE_DIR, sub)
+                os.makedirs(cache_subdir, exist_ok=True)
+                if not os.access(cache_subdir, os.W_OK):
+                    raise PermissionError(f"{cache_subdir} is not writable")
+        except OSError as e:
+            print(f"Not caching attachments in {CODA_CACHE_DIR}: {e}", file=sys.stderr, flush=True)
+            use_cache = False
+
+        async def _fetch(sem, sess, url, part_path, existing):
+            headers = {"Range": f"bytes={existing}-"} if existing else {}
+            async with sem, sess.get(url, headers=headers) as response:
+                response.raise_for_status()
+                # 206 means the range was honoured; a 200 carries the whole file.
+                mode = 'ab' if response.status == 206 else 'wb'
+                async with aiofiles.open(part_path, mode) as f:
+                    async for chunk in response.content.iter_chunked(_DOWNLOAD_CHUNK_SIZE):
+                        await f.write(chunk)
+
+        async def _one(sem, sess, att):
             file_url = att.get("url")
             file_name = att.get("name")
 
             if not file_url or not file_name:
-                continue
+                return None
 
             # Ensure unique filename if multiple rows have same filename
             # using row_id as prefix
@@ -231,26 +681,93 @@ async def download_coda_attachments(doc_id: str, table_id: str, attachment_colum
             unique_name = f"{row_id}_{file_name}"
             file_path = os.path.join(resolved_output_dir, unique_name)
 
-            response = await asyncio.to_thread(requests.get, file_url, stream=True)
-            response.raise_for_status()
-
-            def save_attachment():
-                with open(file_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-
-            await asyncio.to_thread(save_attachment)
-
-            downloaded_paths.append(file_path)
-
-        return downloaded_paths
+            # Downloads always go to a .part file that replaces the output once
+            # complete, so an output is never left half written.
+            size = att.get("size")
+            if size is None or not use_cache:
+                # Without a size there is no cache key, so the file is fetched whole.
+                part_path = f"{file_path}.{uuid.uuid4().hex}.part"
+                try:
+                    await _fetch(sem, sess, file_url, part_path, 0)
+                    os.replace(part_path, file_path)
+                except BaseException:
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(part_path)
+                    raise
+                return file_path
+
+            # Attachments are cached under their (url, size) and copied into
+            # place from there, so a cached one isn't downloaded again. Copying
+            # rather than hardlinking means editing an output in place can't
+            # change what the cache serves for later downloads. The
+            # .part file is named by the same key, so an interrupted download
+            # is only ever resumed from the URL it started from.
+            cache_path = _attachment_cache_path(file_url, size)
+            async with _keyed_lock(_DOWNLOAD_LOCKS, cache_path):
+                if os.path.exists(cache_path) and os.path.getsize(cache_path) == size:
+                    await asyncio.to_thread(os.utime, cache_path)
+                else:
+                    part_path = os.path.join(CODA_CACHE_DIR, "partial", os.path.basename(cache_path))
+                    existing = os.path.getsize(part_path) if resume and os.path.exists(part_path) else 0
+                    await _fetch(sem, sess, file_url, part_path, existing if existing < size else 0)
+
+                    if os.path.getsize(part_path) != size:
+                        # The download doesn't match the size Coda reported, so
+                        # it is handed over as is but kept out of the cache.
+                        os.replace(part_path, file_path)
+                        return file_path
+                    os.replace(part_path, cache_path)
+
+            await asyncio.to_thread(_copy_file, cache_path, file_path)
+            return file_path
+
+        sem = asyncio.Semaphore(max_concurrent)
+        sess = _get_http_session()
+        results = await asyncio.gather(*[_one(sem, sess, att) for att in attachments], return_exceptions=True)
+        if use_cache:
+            _run_in_background(_evict_cache, CODA_CACHE_DIR)
+
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            raise RuntimeError(f"{len(errors)} of {len(results)} downloads failed, first error: {errors[0]}")
+
+        return [r for r in results if r is not None]
     except Exception as e:
         raise RuntimeError(f"An error occurred while downloading attachments: {e}")
 
 
-
-import shutil
 import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Zips with many members are extracted across worker processes, since
+# decompression is CPU-bound. Smaller zips aren't worth the process overhead.
+_PARALLEL_EXTRACT_MIN_MEMBERS = 8
+_EXTRACT_WORKERS = os.cpu_count() or 1
+_EXTRACT_POOL: ProcessPoolExecutor | None = None
+
+
+def _get_extract_pool() -> ProcessPoolExecutor:
+    """Returns the extraction process pool, creating it on first use."""
+    global _EXTRACT_POOL
+    if _EXTRACT_POOL is None:
+        # The server runs worker threads, and forking a multi-threaded process
+        # can deadlock the child, so workers start from a forkserver instead.
+        _EXTRACT_POOL = ProcessPoolExecutor(
+            max_workers=_EXTRACT_WORKERS, mp_context=multiprocessing.get_context("forkserver")
+        )
+    return _EXTRACT_POOL
+
+
+def _extract_members(zip_path: str, members: list[str], output_dir: str):
+    """Extracts the given members of a zip file, using its own ZipFile handle."""
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for member in members:
+            try:
+                zip_ref.extract(member, output_dir)
+            except FileExistsError:
+                # Another worker created the same parent directory concurrently.
+                zip_ref.extract(member, output_dir)
 
 @mcp.tool()
 async def unzip_and_inspect_data(zip_filepath: str, output_dir: str):
@@ -269,42 +786,120 @@ async def unzip_and_inspect_data(zip_filepath: str, output_dir: str):
 
         os.makedirs(resolved_output_dir, exist_ok=True)
 
-        def extract_zip():
+        def list_members():
             with zipfile.ZipFile(resolved_zip_path, 'r') as zip_ref:
-                zip_ref.extractall(resolved_output_dir)
+                return zip_ref.namelist()
 
-        await asyncio.to_thread(extract_zip)
+        members = await asyncio.to_thread(list_members)
+
+        if len(members) < _PARALLEL_EXTRACT_MIN_MEMBERS:
+            await asyncio.to_thread(_extract_members, resolved_zip_path, members, resolved_output_dir)
+        else:
+            loop = asyncio.get_running_loop()
+            pool = _get_extract_pool()
+            num_shards = min(_EXTRACT_WORKERS, len(members))
+            shards = [members[i::num_shards] for i in range(num_shards)]
+            await asyncio.gather(*[
+                loop.run_in_executor(pool, _extract_members, resolved_zip_path, shard, resolved_output_dir)
+                for shard in shards
+            ])
+
+        csv_paths = [
+            os.path.join(root, file)
+            for root, _, files in os.walk(resolved_output_dir)
+            for file in files
+            if file.endswith('.csv')
+        ]
+
+        # Only the header row is needed, and the files are read concurrently.
+        headers = await asyncio.gather(
+            *[asyncio.to_thread(pd.read_csv, file_path, nrows=0) for file_path in csv_paths],
+            return_exceptions=True
+        )
 
         results = {}
 
-        for root, _, files in os.walk(resolved_output_dir):
-            for file in files:
-                if file.endswith('.csv'):
-                    file_path = os.path.join(root, file)
-                    rel_path = os.path.relpath(file_path, resolved_output_dir)
+        for file_path, header in zip(csv_paths, headers):
+            rel_path = os.path.relpath(file_path, resolved_output_dir)
 
-                    try:
-                        df = await asyncio.to_thread(pd.read_csv, file_path)
-                        cols = list(df.columns)
-                        num_cols = len(cols)
+            if isinstance(header, Exception):
+                results[rel_path] = {"error": str(header)}
+                continue
+
+            cols = list(header.columns)
+            num_cols = len(cols)
 
-                        file_info = {"num_columns": num_cols}
+            file_info = {"num_columns": num_cols}
 
-                        if num_cols < 30:
-                            file_info["columns"] = cols
-                        else:
-                            first_15 = cols[:15]
-                            last_15 = cols[-15:]
-                            file_info["summary"] = f"number of columns = {num_cols}, first 15 columns = {first_15}; last 15 columns = {last_15}"
+            if num_cols < 30:
+                file_info["columns"] = cols
+            else:
+                first_15 = cols[:15]
+                last_15 = cols[-15:]
+                file_info["summary"] = f"number of columns = {num_cols}, first 15 columns = {first_15}; last 15 columns = {last_15}"
 
-                        results[rel_path] = file_info
-                    except Exception as csv_err:
-                        results[rel_path] = {"error": str(csv_err)}
+            results[rel_path] = file_info
 
         return results
     except Exception as e:
         raise RuntimeError(f"An error occurred while unzipping and inspecting data: {e}")
 
+
+# Tools that can be called through batch_execute.
+_BATCH_TOOLS = {
+    "list_docs": list_docs,
+    "list_tables": list_tables,
+    "get_table_content": get_table_content,
+    "get_table_attachments": get_table_attachments,
+    "download_coda_attachments": download_coda_attachments,
+    "unzip_and_inspect_data": unzip_and_inspect_data,
+}
+
+@mcp.tool()
+async def batch_execute(operations: list[dict], max_concurrent: int = 8, stop_on_error: bool = False):
+    """
+    Runs several tool calls in a single request, concurrently, and returns all of their results.
+
+    Args:
+        operations (list[dict]): The calls to run, each of the form
+            {"name": <tool name>, "arguments": {<argument name>: <value>, ...}}.
+            Supported tools: list_docs, list_tables, get_table_content,
+            get_table_attachments, download_coda_attachments, unzip_and_inspect_data.
+        max_concurrent (int): Maximum number of calls running at the same time.
+        stop_on_error (bool): If True, the whole batch fails on the first failed call.
+            Otherwise every call runs and failures are reported per call.
+    Returns:
+        list: One dict per operation, in order, with 'name', 'ok' and either 'result' or 'error'.
+    """
+    sem = asyncio.Semaphore(max_concurrent)
+
+    async def _bounded(op):
+        name = op.get("name")
+        tool = _BATCH_TOOLS.get(name)
+        if tool is None:
+            raise ValueError(f"Unknown tool '{name}'")
+        async with sem:
+            return await tool(**op.get("arguments", {}))
+
+    tasks = [asyncio.create_task(_bounded(op)) for op in operations]
+    try:
+        results = await asyncio.gather(*tasks, return_exceptions=not stop_on_error)
+    except Exception as e:
+        raise RuntimeError(f"An error occurred while executing the batch: {e}")
+    finally:
+        # gather doesn't cancel the other calls when one fails, so with
+        # stop_on_error (or if the batch itself is cancelled) the calls still
+        # running are cancelled here and waited for before returning.
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return [
+        {"name": op.get("name"), "ok": False, "error": str(r)} if isinstance(r, BaseException)
+        else {"name": op.get("name"), "ok": True, "result": r}
+        for op, r in zip(operations, results)
+    ]
+
 # --- Server Execution ---
 # This block ensures the server only runs when the script is executed directly.
 if __name__ == "__main__":
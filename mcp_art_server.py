@@ -1,7 +1,8 @@
 # mcp_art_server.py
 import asyncio
+import contextlib
 import os
-import subprocess
+from itertools import islice
 from typing import Dict, Any
 
 import pandas as pd
@@ -19,6 +20,11 @@ if not OPENAI_API_KEY:
 
 BASE_URL = os.getenv("LITELLM_BASE_URL")
 
+# Limits on how much of the project is pasted into LLM prompts. Prompt size
+# drives both latency and cost, and the head of each is enough for the model.
+PROMPT_MAX_DIR_LINES = 500
+PROMPT_SAMPLE_ROWS = 20
+
 
 # LLM_CLIENT = OpenAI(base_url = BASE_URL,
 #                     api_key=OPENAI_API_KEY)
@@ -34,56 +40,105 @@ mcp = FastMCP(
 )
 
 
+# Files backing each resource URI. They are static while the server runs, so
+# each one is read from disk on first use and served from memory afterwards.
+_RESOURCE_PATHS = {
+    "art://template": 'art_template.py',
+    "art://liquid_handling_template": '/app/art_code/liquid_handler_instructions_template.py',
+    "art://stock_concentrations": '/app/Isoprenol_media_optimization/data/stock_concentrations.csv',
+    "art://docs": 'recommendationEngine_docs.txt',
+    "art://preprocess": '/app/art-core/art/preprocess.py',
+    "art://optimizer": '/app/art-core/art/core/optimizer.py',
+    "art://recommender": '/app/art-core/art/core/recommender.py',
+    "art://recommendation_engine": '/app/art-core/art/core/recommendation_engine.py',
+}
+_RESOURCE_CACHE: dict[str, str] = {}
+
+
+def get_resource(uri: str) -> str:
+    """Returns the contents of the file behind a resource URI."""
+    if uri not in _RESOURCE_CACHE:
+        with open(_RESOURCE_PATHS[uri], 'r') as file:
+            _RESOURCE_CACHE[uri] = file.read()
+    return _RESOURCE_CACHE[uri]
+
+
+def preload_resources():
+    """Reads every resource file into memory so requests never wait on disk."""
+    for uri in _RESOURCE_PATHS:
+        try:
+            get_resource(uri)
+        except OSError as e:
+            print(f"Could not preload resource {uri}: {e}", file=sys.stderr, flush=True)
+
+
+def art_reference_context() -> str:
+    """The ART template, docs and core classes that the ART prompts are built on."""
+    return (
+        f"[Template]:\n```python\n{get_resource('art://template')}\n```\n"
+        f"[Docs]:\n```text\n{get_resource('art://docs')}\n```\n"
+        f"[Optimizer]:\n```python\n{get_resource('art://optimizer')}\n```\n"
+        f"[Recommender]:\n```python\n{get_resource('art://recommender')}\n```"
+    )
+
+
+def cached_prompt_messages(static_context: str, prompt: str) -> list:
+    """
+    Builds the LLM messages with the static context first, marked as cacheable,
+    followed by the per-request prompt. The provider can then reuse the cached
+    context across calls instead of processing it again each time.
+    """
+    return [{
+        "role": "user",
+        "content": [
+            {"type": "text", "text": static_context, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": prompt},
+        ],
+    }]
+
+
 @mcp.resource("art://template")
 def get_art_template() -> str:
     """Provides basic documentation for the recommendation engine"""
     
-    with open('art_template.py', 'r') as file:
-        return file.read()
+    return get_resource("art://template")
     
 @mcp.resource("art://liquid_handling_template")
-def get_art_template() -> str:
+def get_liquid_handling_template() -> str:
     """Provides a template to generate liquid handling instructions"""
     
-    with open('/app/art_code/liquid_handler_instructions_template.py', 'r') as file:
-        return file.read()
+    return get_resource("art://liquid_handling_template")
 
 @mcp.resource("art://stock_concentrations")
-def get_art_template() -> str:
+def get_stock_concentrations() -> str:
     """contains the stock concentrations"""
     
-    with open('/app/Isoprenol_media_optimization/data/stock_concentrations.csv', 'r') as file:
-        return file.read()
+    return get_resource("art://stock_concentrations")
 
 @mcp.resource("art://docs")
 def get_RE_docs() -> str:
     """Provides the ART Python code template."""
-    with open('recommendationEngine_docs.txt', 'r') as file:
-        return file.read()
+    return get_resource("art://docs")
     
 @mcp.resource("art://preprocess")
-def get_art_optimizer() -> str:
-    """Provides the sub class, optimizer"""
-    with open('/app/art-core/art/preprocess.py', 'r') as file:
-        return file.read()
+def get_art_preprocess() -> str:
+    """Provides the preprocessing module"""
+    return get_resource("art://preprocess")
     
 @mcp.resource("art://optimizer")
 def get_art_optimizer() -> str:
     """Provides the sub class, optimizer"""
-    with open('/app/art-core/art/core/optimizer.py', 'r') as file:
-        return file.read()
+    return get_resource("art://optimizer")
     
 @mcp.resource("art://recommender")
 def get_art_recommender() -> str:
     """Provides the sub class, recommender"""
-    with open('/app/art-core/art/core/recommender.py', 'r') as file:
-        return file.read()
+    return get_resource("art://recommender")
     
 @mcp.resource("art://recommendation_engine")
 def get_art_recommendationEngine() -> str:
     """Provides the code for the main class, recommendation engine"""
-    with open('/app/art-core/art/core/recommendation_engine.py', 'r') as file:
-        return file.read()
+    return get_resource("art://recommendation_engine")
 
 
 # --- Helper Functions ---
@@ -108,7 +163,7 @@ def save_file(filepath: str, content: str):
     with open(filepath, "w") as f:
         f.write(content)
 
-async def run_art_in_docker(script_path: str) -> str:
+async def run_art_in_docker(script_path: str, ctx: Context | None = None) -> str:
     host_project_path = os.getenv("HOST_PROJECT_PATH")
     art_src_path = os.getenv("ART_SRC_PATH")
     if not host_project_path or not art_src_path:
@@ -123,45 +178,120 @@ async def run_art_in_docker(script_path: str) -> str:
         "jbei/art-core", script_path
     ]
 
-    def blocking_docker_run():
-        try:
-            result = subprocess.run(command, check=True, capture_output=True, text=True, timeout=3600)
-            return f"--- ART Core Execution Successful ---\nSTDOUT:\n{result.stdout}"
-        except subprocess.CalledProcessError as e:
-            return f"--- ERROR Running ART Core ---\nSTDERR:\n{e.stderr}"
-        except subprocess.TimeoutExpired as e:
-            return f"--- ERROR: ART Core execution timed out. ---\nSTDERR:\n{e.stderr}"
-
-    return await asyncio.to_thread(blocking_docker_run)
+    proc = await asyncio.create_subprocess_exec(
+        *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, limit=1 << 20
+    )
+    stdout_lines = []
+    stderr_chunks = []
+
+    # stdout is forwarded line by line so the client sees progress while the
+    # container runs; stderr is drained alongside it so neither pipe fills up.
+    # readline() fails on a line longer than the stream limit, so lines are
+    # read with readuntil() and an overlong one is put back together from
+    # pieces instead of aborting the run.
+    async def read_stdout():
+        pieces = []
+        while True:
+            try:
+                pieces.append(await proc.stdout.readuntil(b"\n"))
+            except asyncio.IncompleteReadError as e:
+                # End of output; the last line may have no newline.
+                pieces.append(e.partial)
+            except asyncio.LimitOverrunError as e:
+                pieces.append(await proc.stdout.read(e.consumed))
+                continue
+            line = b"".join(pieces)
+            if not line:
+                break
+            pieces.clear()
+            text = line.decode(errors="replace")
+            stdout_lines.append(text)
+            if ctx:
+                await ctx.info(text.rstrip())
+
+    async def read_stderr():
+        while chunk := await proc.stderr.read(65536):
+            stderr_chunks.append(chunk.decode(errors="replace"))
+
+    # The process is killed on any early exit (a timeout, a failed ctx.info
+    # after the client has gone), so it never runs on with nobody draining
+    # its pipes.
+    try:
+        await asyncio.wait_for(asyncio.gather(read_stdout(), read_stderr(), proc.wait()), timeout=3600)
+    except asyncio.TimeoutError:
+        return f"--- ERROR: ART Core execution timed out. ---\nSTDERR:\n{''.join(stderr_chunks)}"
+    finally:
+        if proc.returncode is None:
+            with contextlib.suppress(ProcessLookupError):
+                proc.kill()
+            await proc.wait()
+
+    if proc.returncode != 0:
+        return f"--- ERROR Running ART Core ---\nSTDERR:\n{''.join(stderr_chunks)}"
+    return f"--- ART Core Execution Successful ---\nSTDOUT:\n{''.join(stdout_lines)}"
 
 @mcp.tool()
 def read_csv_file(filename: str):
     df = pd.read_csv(filename)
     return df
 
+# Indentation for each depth of the directory listing, built once.
+_INDENTS = [' ' * 4 * depth for depth in range(64)]
+
+
+def _indent(depth: int) -> str:
+    return _INDENTS[depth] if depth < len(_INDENTS) else ' ' * 4 * depth
+
+
+def _walk_directory(path: str, depth: int, output_lines: list):
+    """Appends the listing of path and its subdirectories, in os.walk order."""
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError:
+        return
+
+    # Add the directory line
+    output_lines.append(_indent(depth) + os.path.basename(path) + '/')
+
+    files = []
+    subdirs = []
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+
+        # Like os.walk, symlinked directories are not descended into
+        if is_dir:
+            if not entry.is_symlink():
+                subdirs.append(entry.path)
+        else:
+            files.append(entry.name)
+
+    # Add the file lines
+    subindent = _indent(depth + 1)
+    output_lines.extend(subindent + name for name in files)
+
+    for subdir in subdirs:
+        _walk_directory(subdir, depth + 1, output_lines)
+
 # --- Core MCP Tool ---
 @mcp.tool()
-def get_directory_structure_string(startpath):
+def get_directory_structure_string(startpath, max_lines: int | None = None):
     """
     Returns the directory structure as a string starting from the given path.
+    If max_lines is given, the listing is cut off after that many lines.
     """
     
     # Use a list to accumulate the output lines
     output_lines = []
-    
-    for root, dirs, files in os.walk(startpath):
-        level = root.replace(startpath, '').count(os.sep)
-        indent = ' ' * 4 * (level)
-        
-        # Add the directory line
-        output_lines.append(f'{indent}{os.path.basename(root)}/')
-        
-        subindent = ' ' * 4 * (level + 1)
-        
-        # Add the file lines
-        for f in files:
-            output_lines.append(f'{subindent}{f}')
-            
+    _walk_directory(startpath, 0, output_lines)
+
+    if max_lines is not None and len(output_lines) > max_lines:
+        omitted = len(output_lines) - max_lines
+        output_lines = output_lines[:max_lines] + [f'... ({omitted} more entries)']
+
     # Join all lines with a newline character and return the single string
     return '\n'.join(output_lines)
 
@@ -183,22 +313,20 @@ async def generate_robotic_instructions(prompt: str, project_dir: str, output_co
         print("--- SERVER: Step 1/5: Analyzing directory structure... ---", file=sys.stderr, flush=True)
         await ctx.info("--- SERVER: Step 1/5: Analyzing directory structure... ---")
 
-        dir_struct = get_directory_structure_string(project_dir)
+        dir_struct = get_directory_structure_string(project_dir, max_lines=PROMPT_MAX_DIR_LINES)
 
         print("--- SERVER: Step 2/5: Reading resources... ---", file=sys.stderr, flush=True)
         await ctx.info("--- SERVER: Step 2/5: Reading resources... ---")
 
-        lh_template = await ctx.read_resource("art://liquid_handling_template")
-        stock_concentrations = await ctx.read_resource("art://stock_concentrations")
-
-        sample_file = pd.read_csv(sample_file_path)
+        lh_template = get_resource("art://liquid_handling_template")
+        stock_concentrations = get_resource("art://stock_concentrations")
 
-        generation_prompt = f"""
-        Generate robotic instructions for the current DBTL cycle.
-        all of the data regarding this project are in `{project_dir}`, which has the following structure.\n
-        [directory structure]:\n
-        {dir_struct}\n
+        # The header and first rows are embedded as raw text; parsing them into
+        # a DataFrame only to print its repr isn't needed.
+        with open(sample_file_path, 'r') as file:
+            sample_file = ''.join(islice(file, PROMPT_SAMPLE_ROWS + 1))
 
+        static_context = f"""
         Here is a template on how to generate liquid handling instructions:\n
         [code template]:\n
         {lh_template}\n
@@ -206,6 +334,13 @@ async def generate_robotic_instructions(prompt: str, project_dir: str, output_co
         Here are the stock concentrations too:\n
         [stock concentrations]:\n
         {stock_concentrations}
+        """
+
+        generation_prompt = f"""
+        Generate robotic instructions for the current DBTL cycle, using the template and stock concentrations above.
+        all of the data regarding this project are in `{project_dir}`, which has the following structure.\n
+        [directory structure]:\n
+        {dir_struct}\n
 
         The files you will be starting with look like this:\n
         [sample file]:\n
@@ -218,9 +353,9 @@ async def generate_robotic_instructions(prompt: str, project_dir: str, output_co
         print("--- Step 3/5: Generating ART code with an LLM... ---", file=sys.stderr, flush=True)
 
         await ctx.info("Step 3/5: Generating ART code with an LLM...")
-        response = litellm.completion(
+        response = await litellm.acompletion(
             model='anthropic/claude-sonnet',
-            messages=[{"role": "user", "content": generation_prompt}],
+            messages=cached_prompt_messages(static_context, generation_prompt),
             api_base=BASE_URL,
             api_key=OPENAI_API_KEY
         )
@@ -238,7 +373,7 @@ async def generate_robotic_instructions(prompt: str, project_dir: str, output_co
         print("--- Step 5/5: Executing ART code in container... ---", file=sys.stderr, flush=True)
 
         await ctx.info("Step 5/5: Executing ART code in container...")
-        result = await run_art_in_docker(script_path)
+        result = await run_art_in_docker(script_path, ctx)
         await ctx.info("ART execution finished.")
         return result
 
@@ -262,7 +397,7 @@ async def create_template_csv(path: str, csv_prompt: str, ctx: Context) -> str:
         template = read_file('data/template.csv')
         prompt_to_llm = f"Generate a CSV template for ART based on the following description:\n{csv_prompt}, following the format of\n\n{template}\n\nProvide only the CSV content without any additional text."
         print(prompt_to_llm, file=sys.stderr, flush=True)
-        response = litellm.completion(
+        response = await litellm.acompletion(
             model='anthropic/claude-sonnet',
             messages=[{"role": "user", "content": prompt_to_llm}],
             api_base=BASE_URL,
@@ -288,15 +423,12 @@ async def answer_question(question: str, ctx: Context) -> str:
     try:
         await ctx.info("Generating answer using LLM...")
         await ctx.info("Step 1/5: Reading Resources...")
-        template_code = await ctx.read_resource("art://template")
-        recEngine_docs = await ctx.read_resource("art://docs")
-        optimizer_code = await ctx.read_resource("art://optimizer")
-        recommender_code = await ctx.read_resource("art://recommender")
+        reference_context = art_reference_context()
         await ctx.info("Step 2/5: Asking LLM...")
-        prompt_to_llm = f"Answer the following question concisely:\n{question}\n\nHere is some relevant information:\n[Template]:\n```python\n{template_code}\n```\n[Docs]:\n```text\n{recEngine_docs}\n```[Optimizer]:\n```python\n{optimizer_code}\n```[Recommender]:\n```python\n{recommender_code}\n```"
-        response = litellm.completion(
+        prompt_to_llm = f"Using the information above, answer the following question concisely:\n{question}"
+        response = await litellm.acompletion(
             model='anthropic/claude-sonnet',
-            messages=[{"role": "user", "content": prompt_to_llm}],
+            messages=cached_prompt_messages(reference_context, prompt_to_llm),
             api_base=BASE_URL,
             api_key=OPENAI_API_KEY
         )
@@ -341,41 +473,21 @@ async def run_art_analysis(
         print("--- Step 2/5: Reading Resources... ---", file=sys.stderr, flush=True)
 
         await ctx.info("Step 2/5: Reading Resources...")
-        template_code = await ctx.read_resource("art://template")
-        recEngine_docs = await ctx.read_resource("art://docs")
-        recEngine_code = await ctx.read_resource("art://recommendation_engine")
-        optimizer_code = await ctx.read_resource("art://optimizer")
-        recommender_code = await ctx.read_resource("art://recommender")
+        reference_context = art_reference_context()
         print("--- Step 3/5: Generating ART code with an LLM... ---", file=sys.stderr, flush=True)
 
         await ctx.info("Step 3/5: Generating ART code with an LLM...")
         
         os.makedirs(output_dir, exist_ok=True)
-        generation_prompt = f"""Complete the following ART code template based on the user's request and data analysis.\n
+        generation_prompt = f"""Complete the ART code template above based on the user's request and data analysis.\n
         User Request: {prompt}\n
         Target directory: {output_dir} \n 
         Data Analysis: {analysis['description']}\n
-        [Template]:\n
-        ```python\n
-        {template_code}\n
-        ```\n
-        [Docs]:
-        ```text\n
-        {recEngine_docs}\n
-        ```\n
-        [Optimizer]:\n
-        ```python\n
-        {optimizer_code}\n
-        ```\n
-        [Recommender]:\n
-        ```python\n
-        {recommender_code}\n
-        ```\n
         Return only the raw, complete Python code."""
         
-        response = litellm.completion(
+        response = await litellm.acompletion(
             model='anthropic/claude-sonnet',
-            messages=[{"role": "user", "content": generation_prompt}],
+            messages=cached_prompt_messages(reference_context, generation_prompt),
             api_base=BASE_URL,
             api_key=OPENAI_API_KEY
         )
@@ -392,9 +504,7 @@ async def run_art_analysis(
         print("--- Step 5/5: Executing ART code in container... ---", file=sys.stderr, flush=True)
 
         await ctx.info("Step 5/5: Executing ART code in container...")
-        result = await run_art_in_docker(script_path)
-        await ctx.info("ART execution finished.")
-        
+
         if secondary_prompt:
             print("-------------------------------- \n --- Step 6/5: Found secondary objective. Generating prompt...  ---", file=sys.stderr, flush=True)
             secondary_generation_prompt = f"""
@@ -408,18 +518,35 @@ async def run_art_analysis(
             **Return only the raw, complete Python code.**
             """
             print("--- Step 7/9: Generating secondary code... ---", file=sys.stderr, flush=True)
-            secondary_response = litellm.completion(
-            model='anthropic/claude-sonnet',
-            messages=[{"role": "user", "content": secondary_generation_prompt}],
-            api_base=BASE_URL,
-            api_key=OPENAI_API_KEY
-        )
+            # Generating the secondary code only needs the primary code, not its
+            # results, so it runs while the primary code executes in Docker.
+            # Both are always awaited, so a failed generation can't abandon
+            # the primary run or lose its result.
+            result, secondary_response = await asyncio.gather(
+                run_art_in_docker(script_path, ctx),
+                litellm.acompletion(
+                    model='anthropic/claude-sonnet',
+                    messages=[{"role": "user", "content": secondary_generation_prompt}],
+                    api_base=BASE_URL,
+                    api_key=OPENAI_API_KEY
+                ),
+                return_exceptions=True
+            )
+            if isinstance(result, BaseException):
+                raise result
+            await ctx.info("ART execution finished.")
+            if isinstance(secondary_response, BaseException):
+                await ctx.error(f"Generating the secondary code failed: {secondary_response}")
+                return f"{result}\n--- ERROR: Secondary code generation failed: {secondary_response} ---"
             secondary_generated_code = secondary_response.choices[0].message.content.strip().removeprefix("```python").removesuffix("```").strip()
             print("--- Step 8/9: Saving secondary code... ---", file=sys.stderr, flush=True)
             secondary_script_path = os.path.join(output_dir, "secondary_generated_art_code.py")
             save_file(secondary_script_path, secondary_generated_code)
             print("--- Step 9/9: Running secondary code... ---", file=sys.stderr, flush=True)
-            await run_art_in_docker(secondary_script_path)
+            await run_art_in_docker(secondary_script_path, ctx)
+        else:
+            result = await run_art_in_docker(script_path, ctx)
+            await ctx.info("ART execution finished.")
 
         
         return result
@@ -431,5 +558,5 @@ async def run_art_analysis(
 # --- Server Execution ---
 if __name__ == "__main__":
 
-    
+    preload_resources()
     mcp.run()
\ No newline at end of file
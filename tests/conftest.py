@@ -0,0 +1,69 @@
+import os
+import sys
+
+import pytest
+
+# Both servers read their API keys at import time. The offline tests never
+# reach the real APIs, so placeholders are enough.
+os.environ.setdefault("CODA_API_KEY", "test-key")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def isolated_server(tmp_path, monkeypatch):
+    """Points coda_mcp_server's caches at fresh, empty state for one test."""
+    import coda_mcp_server as server
+
+    monkeypatch.setattr(server, "CODA_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(server, "WORKING_DIR_RESTRICTION", None)
+    monkeypatch.setattr(server, "_ABS_RESTRICTION", None)
+    monkeypatch.setattr(server, "_ABS_RESTRICTION_SEP", None)
+    monkeypatch.setattr(server, "_DOC_CACHE", {})
+    monkeypatch.setattr(server, "_DOC_LOCKS", {})
+    monkeypatch.setattr(server, "_METADATA_CACHE", {})
+    monkeypatch.setattr(server, "_DOWNLOAD_LOCKS", {})
+    return server
+
+
+class StubRows:
+    """Serves a table as pages from the rows endpoint and counts the requests."""
+
+    def __init__(self, rows, page_size=2, updated_at="2024-01-01T00:00:00Z"):
+        self.rows = rows
+        self.page_size = page_size
+        self.updated_at = updated_at
+        self.page_requests = 0
+
+    async def fetch_row_page(self, doc_id, table_id, params):
+        self.page_requests += 1
+        start = int(params.get("pageToken", 0))
+        end = start + min(self.page_size, params["limit"])
+        page = {"items": [{"id": f"i-{n}", "values": values} for n, values in enumerate(self.rows[start:end], start)]}
+        if end < len(self.rows):
+            page["nextPageToken"] = str(end)
+        return page
+
+    async def fetch_table_info(self, doc_id, table_id):
+        return {"id": table_id, "updatedAt": self.updated_at}
+
+
+@pytest.fixture
+def stub_rows(isolated_server, monkeypatch):
+    """Replaces the Coda rows and table endpoints with a StubRows serving the given rows."""
+    def install(rows, **kwargs):
+        stub = StubRows(rows, **kwargs)
+        monkeypatch.setattr(isolated_server, "_fetch_row_page", stub.fetch_row_page)
+        monkeypatch.setattr(isolated_server, "_fetch_table_info", stub.fetch_table_info)
+        return stub
+    return install
+
+
+@pytest.fixture
+def table_rows():
+    return [
+        {"Name": "a", "Value": 1, "Note": ""},
+        {"Name": "b", "Value": 2.5, "Note": "x"},
+        {"Name": "c", "Value": 3, "Note": ""},
+    ]
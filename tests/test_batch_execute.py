@@ -0,0 +1,96 @@
+"""Tests for the batch_execute tool."""
+import asyncio
+
+import pytest
+
+import coda_mcp_server as server
+
+pytestmark = pytest.mark.usefixtures("isolated_server")
+
+
+def test_batch_execute_reports_each_call_in_order(monkeypatch):
+    async def echo(value):
+        await asyncio.sleep(0.01 if value == 1 else 0)
+        return value
+
+    async def fail():
+        raise ValueError("bad call")
+
+    monkeypatch.setattr(server, "_BATCH_TOOLS", {"echo": echo, "fail": fail})
+
+    results = asyncio.run(server.batch_execute([
+        {"name": "echo", "arguments": {"value": 1}},
+        {"name": "fail"},
+        {"name": "missing"},
+        {"name": "echo", "arguments": {"value": 2}},
+    ]))
+
+    assert results[0] == {"name": "echo", "ok": True, "result": 1}
+    assert results[1] == {"name": "fail", "ok": False, "error": "bad call"}
+    assert results[2]["ok"] is False and "Unknown tool" in results[2]["error"]
+    assert results[3] == {"name": "echo", "ok": True, "result": 2}
+
+
+def test_batch_execute_limits_concurrency(monkeypatch):
+    running = 0
+    peak = 0
+
+    async def work():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    monkeypatch.setattr(server, "_BATCH_TOOLS", {"work": work})
+
+    asyncio.run(server.batch_execute([{"name": "work"}] * 6, max_concurrent=2))
+
+    assert peak == 2
+
+
+def test_batch_execute_stop_on_error_fails_whole_batch(monkeypatch):
+    async def fail():
+        raise ValueError("bad call")
+
+    monkeypatch.setattr(server, "_BATCH_TOOLS", {"fail": fail})
+
+    with pytest.raises(RuntimeError, match="bad call"):
+        asyncio.run(server.batch_execute([{"name": "fail"}], stop_on_error=True))
+
+
+def test_batch_execute_stop_on_error_cancels_running_calls(monkeypatch):
+    events = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            events.append("cancelled")
+            raise
+        events.append("finished")
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise ValueError("bad call")
+
+    monkeypatch.setattr(server, "_BATCH_TOOLS", {"slow": slow, "fail": fail})
+
+    async def run():
+        with pytest.raises(RuntimeError, match="bad call"):
+            await server.batch_execute([{"name": "slow"}, {"name": "fail"}], stop_on_error=True)
+        # Nothing from the batch may still be running once it has returned.
+        assert events == ["cancelled"]
+
+    asyncio.run(run())
+
+
+def test_batch_execute_reports_a_cancelled_call_as_failed(monkeypatch):
+    async def cancelled():
+        raise asyncio.CancelledError()
+
+    monkeypatch.setattr(server, "_BATCH_TOOLS", {"cancelled": cancelled})
+
+    [result] = asyncio.run(server.batch_execute([{"name": "cancelled"}]))
+
+    assert result["ok"] is False
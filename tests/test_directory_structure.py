@@ -0,0 +1,43 @@
+"""Tests for the project listing that is pasted into ART prompts."""
+import os
+
+import pytest
+
+import mcp_art_server as art
+
+
+def walk_listing(startpath):
+    """The listing as the original os.walk implementation produced it."""
+    lines = []
+    for root, _, files in os.walk(startpath):
+        level = root.replace(startpath, '').count(os.sep)
+        lines.append(' ' * 4 * level + os.path.basename(root) + '/')
+        lines.extend(' ' * 4 * (level + 1) + name for name in files)
+    return '\n'.join(lines)
+
+
+@pytest.fixture
+def project(tmp_path):
+    for sub in ("data", "data/raw", "code"):
+        (tmp_path / sub).mkdir()
+    for path in ("README.md", "data/a.csv", "data/raw/b.csv", "code/run.py"):
+        (tmp_path / path).write_text("x")
+    return str(tmp_path)
+
+
+def test_directory_structure_matches_os_walk(project):
+    assert art.get_directory_structure_string(project) == walk_listing(project)
+
+
+def test_directory_structure_is_truncated_to_max_lines(project):
+    full = art.get_directory_structure_string(project).split('\n')
+
+    truncated = art.get_directory_structure_string(project, max_lines=3).split('\n')
+
+    assert truncated[:3] == full[:3]
+    assert truncated[3] == f"... ({len(full) - 3} more entries)"
+    assert len(truncated) == 4
+
+
+def test_directory_structure_within_max_lines_is_unchanged(project):
+    assert art.get_directory_structure_string(project, max_lines=100) == walk_listing(project)
@@ -0,0 +1,49 @@
+"""Tests for the per-doc_id Document cache in coda_mcp_server."""
+import asyncio
+
+import pytest
+
+import coda_mcp_server as server
+
+pytestmark = pytest.mark.usefixtures("isolated_server")
+
+
+def test_get_doc_caches_documents_lru(monkeypatch):
+    created = []
+
+    def fake_document(doc_id, coda=None):
+        created.append(doc_id)
+        return object()
+
+    monkeypatch.setattr(server, "Document", fake_document)
+    monkeypatch.setattr(server, "_DOC_CACHE_MAXSIZE", 2)
+
+    async def run():
+        first = await server._get_doc("a")
+        assert await server._get_doc("a") is first
+        await server._get_doc("b")
+        await server._get_doc("a")  # "a" is now the most recently used
+        await server._get_doc("c")  # evicts "b"
+        await server._get_doc("a")
+        await server._get_doc("b")
+
+    asyncio.run(run())
+    assert created == ["a", "b", "c", "b"]
+
+
+def test_get_doc_shares_one_lock_per_doc_and_drops_it_when_done(monkeypatch):
+    created = []
+
+    def fake_document(doc_id, coda=None):
+        created.append(doc_id)
+        return object()
+
+    monkeypatch.setattr(server, "Document", fake_document)
+
+    async def run():
+        docs = await asyncio.gather(*(server._get_doc(doc_id) for doc_id in ["a", "a", "b", "a"]))
+        assert docs[0] is docs[1] is docs[3]
+
+    asyncio.run(run())
+    assert sorted(created) == ["a", "b"]
+    assert server._DOC_LOCKS == {}
@@ -0,0 +1,183 @@
+"""
+Tests for download_coda_attachments. The attachment host is replaced with an
+in-memory session that honours Range requests.
+"""
+import asyncio
+import os
+
+import pytest
+
+import coda_mcp_server as server
+
+pytestmark = pytest.mark.usefixtures("isolated_server")
+
+
+class FakeResponse:
+    def __init__(self, body, status):
+        self.body = body
+        self.status = status
+        self.content = self
+
+    def raise_for_status(self):
+        pass
+
+    async def iter_chunked(self, size):
+        for start in range(0, len(self.body), size):
+            yield self.body[start:start + size]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+class FakeSession:
+    """Serves attachment bodies by URL, honouring Range requests."""
+
+    def __init__(self, files):
+        self.files = files
+        self.requests = []
+
+    def get(self, url, headers=None):
+        range_header = (headers or {}).get("Range")
+        self.requests.append((url, range_header))
+        body = self.files[url]
+        if range_header:
+            return FakeResponse(body[int(range_header[len("bytes="):-1]):], 206)
+        return FakeResponse(body, 200)
+
+
+@pytest.fixture
+def attachments(monkeypatch):
+    def install(files, listing):
+        session = FakeSession(files)
+
+        async def fake_attachments(doc_id, table_id, column):
+            return listing
+
+        monkeypatch.setattr(server, "_get_http_session", lambda: session)
+        monkeypatch.setattr(server, "get_table_attachments", fake_attachments)
+        return session
+    return install
+
+
+def attachment(url, body, row_id="r1", name="file.bin"):
+    return {"row_id": row_id, "name": name, "url": url, "size": len(body)}
+
+
+def test_download_uses_cache_for_repeated_attachments(tmp_path, attachments):
+    body = b"hello world"
+    session = attachments({"u1": body}, [attachment("u1", body)])
+
+    async def run():
+        first = await server.download_coda_attachments("doc", "grid-1", "Files", str(tmp_path / "a"))
+        second = await server.download_coda_attachments("doc", "grid-1", "Files", str(tmp_path / "b"))
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert len(session.requests) == 1
+    for path in first + second:
+        with open(path, "rb") as f:
+            assert f.read() == body
+
+
+def test_download_does_not_write_into_cached_objects(tmp_path, attachments):
+    old, new = b"version one", b"version two!"
+    attachments({"u1": old, "u2": new}, [attachment("u1", old)])
+    out = tmp_path / "out"
+    asyncio.run(server.download_coda_attachments("doc", "grid-1", "Files", str(out)))
+
+    # The same output name now refers to a different attachment.
+    attachments({"u1": old, "u2": new}, [attachment("u2", new)])
+    asyncio.run(server.download_coda_attachments("doc", "grid-1", "Files", str(out)))
+
+    with open(server._attachment_cache_path("u1", len(old)), "rb") as f:
+        assert f.read() == old
+    assert (out / "r1_file.bin").read_bytes() == new
+
+
+def test_editing_a_downloaded_file_does_not_change_the_cache(tmp_path, attachments):
+    body = b"hello world"
+    attachments({"u1": body}, [attachment("u1", body)])
+    [path] = asyncio.run(server.download_coda_attachments("doc", "grid-1", "Files", str(tmp_path / "a")))
+    # An in-place edit that keeps the size would pass the cache's size check.
+    with open(path, "r+b") as f:
+        f.write(b"HELLO")
+
+    [path] = asyncio.run(server.download_coda_attachments("doc", "grid-1", "Files", str(tmp_path / "b")))
+
+    with open(path, "rb") as f:
+        assert f.read() == body
+
+
+def test_download_resumes_partial_file_of_same_url(tmp_path, attachments):
+    body = b"hello world"
+    session = attachments({"u1": body}, [attachment("u1", body)])
+    partial_dir = tmp_path / "cache" / "partial"
+    partial_dir.mkdir(parents=True)
+    key = os.path.basename(server._attachment_cache_path("u1", len(body)))
+    (partial_dir / key).write_bytes(body[:5])
+
+    [path] = asyncio.run(server.download_coda_attachments("doc", "grid-1", "Files", str(tmp_path / "out")))
+
+    assert session.requests == [("u1", "bytes=5-")]
+    with open(path, "rb") as f:
+        assert f.read() == body
+
+
+def test_download_does_not_trust_existing_output_file(tmp_path, attachments):
+    body = b"new version"
+    session = attachments({"u2": body}, [attachment("u2", body)])
+    out = tmp_path / "out"
+    out.mkdir()
+    # A same-sized file left over from an older version of the attachment.
+    (out / "r1_file.bin").write_bytes(b"old version")
+
+    [path] = asyncio.run(server.download_coda_attachments("doc", "grid-1", "Files", str(out)))
+
+    assert session.requests == [("u2", None)]
+    with open(path, "rb") as f:
+        assert f.read() == body
+    with open(server._attachment_cache_path("u2", len(body)), "rb") as f:
+        assert f.read() == body
+
+
+def test_download_with_wrong_size_is_not_cached(tmp_path, attachments):
+    listing = [{"row_id": "r1", "name": "file.bin", "url": "u1", "size": 99}]
+    attachments({"u1": b"short"}, listing)
+
+    [path] = asyncio.run(server.download_coda_attachments("doc", "grid-1", "Files", str(tmp_path / "out")))
+
+    with open(path, "rb") as f:
+        assert f.read() == b"short"
+    assert not os.path.exists(server._attachment_cache_path("u1", 99))
+
+
+def test_download_without_a_usable_cache_dir(tmp_path, attachments, monkeypatch):
+    (tmp_path / "file").write_text("not a directory")
+    monkeypatch.setattr(server, "CODA_CACHE_DIR", str(tmp_path / "file" / "cache"))
+    body = b"hello world"
+    session = attachments({"u1": body}, [attachment("u1", body)])
+    out = tmp_path / "out"
+
+    [path] = asyncio.run(server.download_coda_attachments("doc", "grid-1", "Files", str(out)))
+
+    assert session.requests == [("u1", None)]
+    with open(path, "rb") as f:
+        assert f.read() == body
+    assert os.listdir(out) == ["r1_file.bin"]
+
+
+def test_concurrent_downloads_of_one_attachment_share_a_lock_and_drop_it(tmp_path, attachments):
+    body = b"hello world"
+    listing = [attachment("u1", body, row_id=row_id) for row_id in ("r1", "r2", "r3")]
+    session = attachments({"u1": body}, listing)
+
+    paths = asyncio.run(server.download_coda_attachments("doc", "grid-1", "Files", str(tmp_path / "out")))
+
+    assert len(session.requests) == 1
+    for path in paths:
+        with open(path, "rb") as f:
+            assert f.read() == body
+    assert server._DOWNLOAD_LOCKS == {}
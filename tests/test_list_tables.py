@@ -0,0 +1,36 @@
+"""Tests for list_tables and its name filter."""
+import asyncio
+
+import pytest
+
+import coda_mcp_server as server
+
+pytestmark = pytest.mark.usefixtures("isolated_server")
+
+
+def test_list_tables_filters_cached_listing(monkeypatch):
+    class Table:
+        def __init__(self, name):
+            self.name, self.id = name, f"id-{name}"
+
+    class FakeDocument:
+        listings = 0
+
+        def __init__(self, doc_id, coda=None):
+            pass
+
+        def list_tables(self):
+            FakeDocument.listings += 1
+            return [Table("Raw data"), Table("Samples"), Table("DATA 2")]
+
+    monkeypatch.setattr(server, "Document", FakeDocument)
+
+    async def run():
+        everything = await server.list_tables("doc")
+        data = await server.list_tables("doc", name_contains="data")
+        return everything, data
+
+    everything, data = asyncio.run(run())
+    assert list(everything) == ["Raw data", "Samples", "DATA 2"]
+    assert data == {"Raw data": "id-Raw data", "DATA 2": "id-DATA 2"}
+    assert FakeDocument.listings == 1
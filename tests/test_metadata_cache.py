@@ -0,0 +1,37 @@
+"""Tests for the TTL cache behind list_docs and list_tables."""
+import asyncio
+
+import pytest
+
+import coda_mcp_server as server
+
+pytestmark = pytest.mark.usefixtures("isolated_server")
+
+
+def test_cached_reuses_value_until_ttl_expires():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return len(calls)
+
+    async def run():
+        assert await server._cached(("k",), fetch) == 1
+        assert await server._cached(("k",), fetch) == 1
+        timestamp, value = server._METADATA_CACHE[("k",)]
+        server._METADATA_CACHE[("k",)] = (timestamp - server._METADATA_TTL - 1, value)
+        assert await server._cached(("k",), fetch) == 2
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_cached_is_bounded(monkeypatch):
+    monkeypatch.setattr(server, "_METADATA_MAXSIZE", 2)
+
+    async def run():
+        for key in range(3):
+            await server._cached((key,), lambda key=key: asyncio.sleep(0, key))
+
+    asyncio.run(run())
+    assert list(server._METADATA_CACHE) == [(1,), (2,)]
@@ -0,0 +1,36 @@
+"""Tests for saving tables as parquet."""
+import asyncio
+
+import pyarrow.parquet as pq
+import pytest
+
+import coda_mcp_server as server
+
+pytestmark = pytest.mark.usefixtures("isolated_server")
+
+
+def test_write_parquet_keeps_numeric_columns_numeric(tmp_path):
+    path = str(tmp_path / "t.parquet")
+    server._write_parquet(path, {
+        "number": [1, 3.5, ""],
+        "integer": [1, 2, 3],
+        "mixed": [1, "a", None],
+        "text": ["a", "", "b"],
+    })
+    table = pq.read_table(path)
+
+    assert str(table.schema.field("number").type) == "double"
+    assert str(table.schema.field("integer").type) == "int64"
+    assert table.column("mixed").to_pylist() == ["1", "a", None]
+    assert table.column("text").to_pylist() == ["a", None, "b"]
+
+
+def test_get_table_content_parquet(table_rows, tmp_path, stub_rows):
+    stub_rows(table_rows)
+    output = str(tmp_path / "table.parquet")
+
+    asyncio.run(server.get_table_content("doc", "grid-1", output))
+
+    table = pq.read_table(output)
+    assert table.column_names == ["Name", "Value", "Note"]
+    assert table.column("Value").to_pylist() == [1.0, 2.5, 3.0]
@@ -0,0 +1,10 @@
+"""Tests for the prompt-caching markers on the static ART context."""
+import mcp_art_server as art
+
+
+def test_cached_prompt_messages_marks_only_static_context_cacheable():
+    [message] = art.cached_prompt_messages("static", "prompt")
+
+    static, prompt = message["content"]
+    assert static == {"type": "text", "text": "static", "cache_control": {"type": "ephemeral"}}
+    assert prompt == {"type": "text", "text": "prompt"}
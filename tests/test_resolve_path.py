@@ -0,0 +1,40 @@
+"""Tests for resolve_path's confinement to WORKING_DIR_RESTRICTION."""
+import os
+
+import pytest
+
+import coda_mcp_server as server
+
+pytestmark = pytest.mark.usefixtures("isolated_server")
+
+
+def restrict_to(monkeypatch, root):
+    root = os.path.abspath(root)
+    monkeypatch.setattr(server, "WORKING_DIR_RESTRICTION", root)
+    monkeypatch.setattr(server, "_ABS_RESTRICTION", root)
+    monkeypatch.setattr(server, "_ABS_RESTRICTION_SEP", root.rstrip(os.sep) + os.sep)
+
+
+def test_resolve_path_without_restriction_is_absolute(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert server.resolve_path("out.csv") == str(tmp_path / "out.csv")
+
+
+def test_resolve_path_inside_restriction(tmp_path, monkeypatch):
+    restrict_to(monkeypatch, tmp_path)
+    assert server.resolve_path("data/out.csv") == str(tmp_path / "data" / "out.csv")
+    assert server.resolve_path(str(tmp_path / "out.csv")) == str(tmp_path / "out.csv")
+    assert server.resolve_path(".") == str(tmp_path)
+
+
+@pytest.mark.parametrize("path", ["../out.csv", "data/../../out.csv", "/etc/passwd"])
+def test_resolve_path_rejects_escapes(tmp_path, monkeypatch, path):
+    restrict_to(monkeypatch, tmp_path / "root")
+    with pytest.raises(ValueError):
+        server.resolve_path(path)
+
+
+def test_resolve_path_rejects_sibling_with_shared_prefix(tmp_path, monkeypatch):
+    restrict_to(monkeypatch, tmp_path / "root")
+    with pytest.raises(ValueError):
+        server.resolve_path(str(tmp_path / "root2" / "out.csv"))
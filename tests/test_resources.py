@@ -0,0 +1,27 @@
+"""Tests for reading and preloading the ART resource files."""
+import mcp_art_server as art
+
+
+def test_get_resource_reads_each_file_once(tmp_path, monkeypatch):
+    path = tmp_path / "template.py"
+    path.write_text("first")
+    monkeypatch.setattr(art, "_RESOURCE_PATHS", {"art://template": str(path)})
+    monkeypatch.setattr(art, "_RESOURCE_CACHE", {})
+
+    assert art.get_resource("art://template") == "first"
+    path.write_text("second")
+    assert art.get_resource("art://template") == "first"
+
+
+def test_preload_resources_skips_missing_files(tmp_path, monkeypatch):
+    present = tmp_path / "docs.txt"
+    present.write_text("docs")
+    monkeypatch.setattr(art, "_RESOURCE_PATHS", {
+        "art://docs": str(present),
+        "art://optimizer": str(tmp_path / "missing.py"),
+    })
+    monkeypatch.setattr(art, "_RESOURCE_CACHE", {})
+
+    art.preload_resources()
+
+    assert art._RESOURCE_CACHE == {"art://docs": "docs"}
@@ -0,0 +1,32 @@
+"""Tests for paging through the Coda rows endpoint."""
+import asyncio
+import contextlib
+
+import pytest
+
+import coda_mcp_server as server
+
+
+def test_iter_row_pages_stops_prefetching_when_consumer_fails(table_rows, stub_rows):
+    stub_rows(table_rows * 10, page_size=1)
+
+    async def run():
+        with pytest.raises(ValueError):
+            async with contextlib.aclosing(server._iter_row_pages("doc", "grid-1", {"limit": 200})) as pages:
+                async for _ in pages:
+                    raise ValueError("consumer failed")
+        await asyncio.sleep(0)
+        return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    assert asyncio.run(run()) == []
+
+
+def test_iter_row_pages_follows_page_tokens(table_rows, stub_rows):
+    stub = stub_rows(table_rows * 3, page_size=2)
+
+    async def run():
+        async with contextlib.aclosing(server._iter_row_pages("doc", "grid-1", {"limit": 200})) as pages:
+            return [item["values"] async for page in pages for item in page["items"]]
+
+    assert asyncio.run(run()) == table_rows * 3
+    assert stub.page_requests == 5
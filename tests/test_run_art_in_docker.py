@@ -0,0 +1,79 @@
+"""
+Tests for run_art_in_docker. Docker is stood in for by a local Python
+subprocess, so these run without Docker.
+"""
+import asyncio
+import sys
+
+import pytest
+
+import mcp_art_server as art
+
+
+@pytest.fixture
+def fake_docker(tmp_path, monkeypatch):
+    """Runs the given Python source in place of the docker command."""
+    monkeypatch.setenv("HOST_PROJECT_PATH", str(tmp_path))
+    monkeypatch.setenv("ART_SRC_PATH", str(tmp_path))
+    create_subprocess_exec = asyncio.create_subprocess_exec
+    processes = []
+
+    def install(source):
+        async def fake_exec(*command, **kwargs):
+            proc = await create_subprocess_exec(sys.executable, "-c", source, **kwargs)
+            processes.append(proc)
+            return proc
+
+        monkeypatch.setattr(art.asyncio, "create_subprocess_exec", fake_exec)
+        return processes
+    return install
+
+
+class RecordingContext:
+    def __init__(self, fail=False):
+        self.messages = []
+        self.fail = fail
+
+    async def info(self, message):
+        if self.fail:
+            raise ConnectionError("client disconnected")
+        self.messages.append(message)
+
+
+def test_run_art_in_docker_streams_stdout(fake_docker):
+    fake_docker("print('step 1'); print('step 2')")
+    ctx = RecordingContext()
+
+    result = asyncio.run(art.run_art_in_docker("script.py", ctx))
+
+    assert result.startswith("--- ART Core Execution Successful ---")
+    assert ctx.messages == ["step 1", "step 2"]
+
+
+def test_run_art_in_docker_reports_failure(fake_docker):
+    fake_docker("import sys; sys.stderr.write('boom'); sys.exit(1)")
+
+    result = asyncio.run(art.run_art_in_docker("script.py"))
+
+    assert result.startswith("--- ERROR Running ART Core ---")
+    assert "boom" in result
+
+
+def test_run_art_in_docker_kills_process_when_streaming_fails(fake_docker):
+    processes = fake_docker("import time; print('started', flush=True); time.sleep(60)")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(art.run_art_in_docker("script.py", RecordingContext(fail=True)))
+
+    assert processes[0].returncode is not None
+
+
+def test_run_art_in_docker_handles_lines_longer_than_the_stream_limit(fake_docker):
+    fake_docker("import sys; sys.stdout.write('x' * (3 << 20) + '\\nlast line without newline')")
+    ctx = RecordingContext()
+
+    result = asyncio.run(art.run_art_in_docker("script.py", ctx))
+
+    assert result.startswith("--- ART Core Execution Successful ---")
+    assert result.endswith("x" * 10 + "\nlast line without newline")
+    assert [len(m) for m in ctx.messages] == [3 << 20, len("last line without newline")]
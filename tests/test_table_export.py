@@ -0,0 +1,52 @@
+"""Tests for saving a Coda table to a file with get_table_content."""
+import asyncio
+import gzip
+import os
+
+import pandas as pd
+
+import coda_mcp_server as server
+
+
+def test_get_table_content_writes_all_pages_to_csv(table_rows, tmp_path, stub_rows):
+    stub = stub_rows(table_rows)
+    output = str(tmp_path / "table.csv")
+
+    result = asyncio.run(server.get_table_content("doc", "grid-1", output))
+
+    assert result == {"num_columns": 3, "columns": ["Name", "Value", "Note"], "output_filepath": output}
+    assert stub.page_requests == 2
+    df = pd.read_csv(output)
+    assert list(df["Name"]) == ["a", "b", "c"]
+
+
+def test_get_table_content_compressed_csv(table_rows, tmp_path, stub_rows):
+    stub_rows(table_rows)
+    output = str(tmp_path / "table.csv")
+
+    result = asyncio.run(server.get_table_content("doc", "grid-1", output, compress=True))
+
+    assert result["output_filepath"] == output + ".gz"
+    with gzip.open(output + ".gz", "rt") as f:
+        assert f.readline().strip() == "Name,Value,Note"
+
+
+def test_get_table_content_inspect_only_writes_nothing(table_rows, tmp_path, stub_rows):
+    stub = stub_rows(table_rows)
+    output = str(tmp_path / "table.csv")
+
+    result = asyncio.run(server.get_table_content("doc", "grid-1", output, inspect_only=True))
+
+    assert result == {"num_columns": 3, "columns": ["Name", "Value", "Note"]}
+    assert stub.page_requests == 1
+    assert not os.path.exists(output)
+
+
+def test_get_table_content_summarizes_wide_tables(tmp_path, stub_rows):
+    stub_rows([{f"c{i}": i for i in range(40)}])
+
+    result = asyncio.run(server.get_table_content("doc", "grid-1", str(tmp_path / "wide.csv")))
+
+    assert result["num_columns"] == 40
+    assert "columns" not in result
+    assert result["summary"].startswith("number of columns = 40")
@@ -0,0 +1,132 @@
+"""Tests for the on-disk table snapshot cache used by get_table_content."""
+import asyncio
+import os
+
+import pandas as pd
+import pytest
+
+import coda_mcp_server as server
+
+
+def test_get_table_content_serves_unchanged_table_from_snapshot(table_rows, tmp_path, stub_rows):
+    stub = stub_rows(table_rows)
+
+    async def run():
+        first = await server.get_table_content("doc", "grid-1", str(tmp_path / "a.csv"))
+        requests = stub.page_requests
+        second = await server.get_table_content("doc", "grid-1", str(tmp_path / "b.csv"))
+        assert stub.page_requests == requests
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first["columns"] == second["columns"]
+    with open(tmp_path / "a.csv", "rb") as a, open(tmp_path / "b.csv", "rb") as b:
+        assert a.read() == b.read()
+
+
+def test_get_table_content_refetches_after_table_changes(table_rows, tmp_path, stub_rows):
+    stub = stub_rows(table_rows)
+
+    async def run():
+        await server.get_table_content("doc", "grid-1", str(tmp_path / "a.csv"))
+        stub.rows = table_rows[:1]
+        stub.updated_at = "2024-02-01T00:00:00Z"
+        await server.get_table_content("doc", "grid-1", str(tmp_path / "b.csv"))
+
+    asyncio.run(run())
+    assert len(pd.read_csv(tmp_path / "b.csv")) == 1
+
+
+def test_editing_an_output_does_not_change_the_snapshot(table_rows, tmp_path, stub_rows):
+    stub_rows(table_rows)
+
+    async def run():
+        await server.get_table_content("doc", "grid-1", str(tmp_path / "a.csv"))
+        with open(tmp_path / "a.csv", "a") as f:
+            f.write("edited,0,\n")
+        await server.get_table_content("doc", "grid-1", str(tmp_path / "b.csv"))
+
+    asyncio.run(run())
+    assert len(pd.read_csv(tmp_path / "b.csv")) == 3
+
+
+def test_failed_save_leaves_previous_output_untouched(table_rows, tmp_path, stub_rows, monkeypatch):
+    stub = stub_rows(table_rows)
+    output = str(tmp_path / "table.csv")
+    asyncio.run(server.get_table_content("doc", "grid-1", output))
+    with open(output, "rb") as f:
+        before = f.read()
+
+    async def failing_page(doc_id, table_id, params):
+        if "pageToken" in params:
+            raise ConnectionError("connection reset")
+        return await stub.fetch_row_page(doc_id, table_id, params)
+
+    monkeypatch.setattr(server, "_fetch_row_page", failing_page)
+    stub.updated_at = "2024-02-01T00:00:00Z"
+    with pytest.raises(RuntimeError, match="connection reset"):
+        asyncio.run(server.get_table_content("doc", "grid-1", output))
+
+    with open(output, "rb") as f:
+        assert f.read() == before
+    assert sorted(os.listdir(tmp_path)) == ["cache", "table.csv"]
+
+
+def test_cache_dir_under_a_file_falls_back_to_plain_save(tmp_path, table_rows, stub_rows, monkeypatch):
+    (tmp_path / "file").write_text("not a directory")
+    monkeypatch.setattr(server, "CODA_CACHE_DIR", str(tmp_path / "file" / "cache"))
+    stub_rows(table_rows)
+    output = str(tmp_path / "table.csv")
+
+    result = asyncio.run(server.get_table_content("doc", "grid-1", output))
+
+    assert result["columns"] == ["Name", "Value", "Note"]
+    assert len(pd.read_csv(output)) == 3
+
+
+def test_failed_snapshot_store_keeps_the_written_output(tmp_path, table_rows, stub_rows, monkeypatch):
+    copy_file = server._copy_file
+
+    def copy_unless_into_cache(src, dst):
+        if dst.startswith(server.CODA_CACHE_DIR):
+            raise OSError(28, "No space left on device")
+        copy_file(src, dst)
+
+    monkeypatch.setattr(server, "_copy_file", copy_unless_into_cache)
+    stub_rows(table_rows)
+    output = str(tmp_path / "table.csv")
+
+    result = asyncio.run(server.get_table_content("doc", "grid-1", output))
+
+    assert result["output_filepath"] == output
+    assert len(pd.read_csv(output)) == 3
+    assert [name for name in os.listdir(tmp_path / "cache" / "objects") if name.endswith(".tmp")] == []
+
+
+def test_expired_snapshot_is_refetched(table_rows, tmp_path, stub_rows, monkeypatch):
+    stub = stub_rows(table_rows)
+    asyncio.run(server.get_table_content("doc", "grid-1", str(tmp_path / "a.csv")))
+    requests = stub.page_requests
+
+    now = server.time.time()
+    monkeypatch.setattr(server.time, "time", lambda: now + server.CODA_TABLE_SNAPSHOT_TTL + 1)
+    asyncio.run(server.get_table_content("doc", "grid-1", str(tmp_path / "b.csv")))
+
+    assert stub.page_requests > requests
+
+
+def test_eviction_removes_a_snapshot_together_with_its_columns(tmp_path, monkeypatch):
+    objects = tmp_path / "cache" / "objects"
+    objects.mkdir(parents=True)
+    for age, key in enumerate(["new", "old"]):
+        for name in (key, f"{key}.columns"):
+            (objects / name).write_bytes(b"x" * 10)
+            os.utime(objects / name, (1000 - age, 1000 - age))
+    # The old snapshot's sidecar was touched last, which must not keep its object alone.
+    os.utime(objects / "old.columns", (2000, 2000))
+    (objects / "partial-write.tmp").write_bytes(b"x" * 100)
+    monkeypatch.setattr(server, "CODA_CACHE_MAX_BYTES", 25)
+
+    server._evict_cache(str(tmp_path / "cache"))
+
+    assert sorted(os.listdir(objects)) == ["old", "old.columns", "partial-write.tmp"]
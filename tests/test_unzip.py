@@ -0,0 +1,64 @@
+"""Tests for unzip_and_inspect_data."""
+import asyncio
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import coda_mcp_server as server
+
+pytestmark = pytest.mark.usefixtures("isolated_server")
+
+
+def write_zip(path, members):
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, content in members.items():
+            zf.writestr(name, content)
+
+
+def test_unzip_small_archive_reports_csv_headers(tmp_path):
+    zip_path = str(tmp_path / "data.zip")
+    write_zip(zip_path, {"a.csv": "x,y\n1,2\n", "notes.txt": "hi"})
+
+    result = asyncio.run(server.unzip_and_inspect_data(zip_path, str(tmp_path / "out")))
+
+    assert result == {"a.csv": {"num_columns": 2, "columns": ["x", "y"]}}
+
+
+def test_unzip_large_archive_extracts_every_shard(tmp_path, monkeypatch):
+    # Threads stand in for the process pool; the sharding is what's under test.
+    pool = ThreadPoolExecutor(max_workers=3)
+    monkeypatch.setattr(server, "_get_extract_pool", lambda: pool)
+    monkeypatch.setattr(server, "_EXTRACT_WORKERS", 3)
+    members = {f"dir{i % 2}/t{i}.csv": f"c{i},d\n1,2\n" for i in range(server._PARALLEL_EXTRACT_MIN_MEMBERS + 3)}
+    zip_path = str(tmp_path / "data.zip")
+    write_zip(zip_path, members)
+
+    try:
+        result = asyncio.run(server.unzip_and_inspect_data(zip_path, str(tmp_path / "out")))
+    finally:
+        pool.shutdown()
+
+    assert sorted(result) == sorted(os.path.normpath(name) for name in members)
+    assert result[os.path.normpath("dir1/t1.csv")]["columns"] == ["c1", "d"]
+
+
+@pytest.fixture
+def extract_pool():
+    """Shuts down the real extraction pool, if the test started one."""
+    yield
+    if server._EXTRACT_POOL is not None:
+        server._EXTRACT_POOL.shutdown()
+        server._EXTRACT_POOL = None
+
+
+def test_unzip_large_archive_through_process_pool(tmp_path, extract_pool):
+    members = {f"t{i}.csv": f"c{i},d\n1,2\n" for i in range(server._PARALLEL_EXTRACT_MIN_MEMBERS + 2)}
+    zip_path = str(tmp_path / "data.zip")
+    write_zip(zip_path, members)
+
+    result = asyncio.run(server.unzip_and_inspect_data(zip_path, str(tmp_path / "out")))
+
+    assert sorted(result) == sorted(members)
+    assert server._EXTRACT_POOL._mp_context.get_start_method() == "forkserver"